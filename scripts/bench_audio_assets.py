@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""Benchmarks and golden-output checks for generate_audio_assets.py.
+
+Timing mode renders each selected recipe in a fresh worker process (so peak RSS
+is per recipe) and times the DSP stages on a fixed synthetic input. Results are
+compared with a JSON baseline from an earlier ``--save`` run on the same engine.
+
+``--golden`` renders the selected recipes with ``--engine`` and with the
+per-sample reference engine, and checks that both agree per sample (within
+SAMPLE_TOLERANCE LSB) and per octave band of the averaged spectrum (within
+SPECTRAL_TOLERANCE_DB). Both engines share the Patch data, the FX chain,
+normalization and the writers, so ``--reference`` also checks against frozen
+assets: WAVs rendered by a known-good revision, or the committed SFX bank.
+
+``--self-test`` runs assertion checks of the pieces that are easy to break
+without an audible change: uniform_noise's draw order, the IMA-ADPCM encoder
+and FirFilter, and of FX chains without AutoPan.
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+import generate_audio_assets as gen
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+np = gen.np
+
+BASELINE_PATH = os.path.join(gen.ROOT, ".audio_bench.json")
+REFERENCE_ENGINE = "python"
+STAGES = ("env_adsr", "apply_delay_stereo", "normalize_stereo", "write_wav")
+STAGE_SECONDS = 10.0
+# Both engines agree to 1 LSB of 16-bit PCM (see generate_audio_assets).
+SAMPLE_TOLERANCE = 1
+SPECTRAL_TOLERANCE_DB = 0.1
+SPECTRUM_FRAME = 4096
+# Octave band edges in Hz; the last band runs to Nyquist.
+SPECTRAL_BANDS = (0.0, 63.0, 125.0, 250.0, 500.0, 1000.0, 2000.0, 4000.0, 8000.0, 16000.0)
+# Bands more than this far below the loudest one are noise floor and not compared.
+SPECTRAL_FLOOR_DB = 80.0
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def bench_recipe(engine: str, name: str, out_dir: str) -> dict:
+    """Render one recipe as PCM and report wall time, throughput and this process's peak RSS."""
+    start = time.perf_counter()
+    gen.render_recipe(engine, name, out_dir, "pcm16")
+    wall = time.perf_counter() - start
+    with wave.open(os.path.join(out_dir, name + ".wav")) as w:
+        frames = w.getnframes()
+    return {
+        "wall_s": wall,
+        "frames": frames,
+        "samples_per_s": frames / wall if wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_recipes(engine: str, names, out_dir: str) -> dict:
+    # A fresh spawned process per recipe keeps ru_maxrss from carrying over.
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[name] = pool.submit(bench_recipe, engine, name, out_dir).result()
+        r = results[name]
+        print(f"  {name:22} {r['wall_s']:8.3f} s {r['samples_per_s'] / 1e3:10.1f} kframes/s {format_mb(r['peak_rss_mb'])}")
+    return results
+
+
+def noise_blocks(seconds: float, seed: int = 0) -> list:
+    """Materialized stereo noise SampleBuffers on the active engine."""
+    rng = random.Random(seed)
+    frames = int(gen.SR * seconds)
+    blocks = []
+    for start in range(0, frames, gen.BLOCK_FRAMES):
+        n = min(gen.BLOCK_FRAMES, frames - start)
+        if gen.ENGINE == "numpy":
+            blocks.append(gen.SampleBuffer.of(0.5 * gen.uniform_noise(rng, n), 0.5 * gen.uniform_noise(rng, n)))
+        else:
+            blocks.append(gen.SampleBuffer.of(
+                [0.5 * rng.uniform(-1.0, 1.0) for _ in range(n)], [0.5 * rng.uniform(-1.0, 1.0) for _ in range(n)]
+            ))
+    return blocks
+
+
+def fresh(blocks):
+    # Effects work in place, so every run gets its own copy of the input.
+    return (block.copy() for block in blocks)
+
+
+def drain(blocks):
+    for _ in blocks:
+        pass
+
+
+def stage_runners(seconds: float, tmp_dir: str) -> dict:
+    frames = int(gen.SR * seconds)
+    blocks = noise_blocks(seconds)
+    wav_path = os.path.join(tmp_dir, "stage.wav")
+
+    def env_adsr():
+        if gen.ENGINE == "numpy":
+            gen.env_adsr(np.arange(frames) / gen.SR, seconds, 0.01, 0.1, 0.6, 0.2)
+        else:
+            for i in range(frames):
+                gen.env_adsr(i / gen.SR, seconds, 0.01, 0.1, 0.6, 0.2)
+
+    return {
+        "env_adsr": env_adsr,
+        "apply_delay_stereo": lambda: drain(gen.apply_delay_stereo(fresh(blocks), 0.22, 0.32, 0.34)),
+        "normalize_stereo": lambda: drain(gen.normalize_stereo(fresh(blocks), 0.90)),
+        "write_wav": lambda: gen.write_wav(wav_path, blocks),
+    }
+
+
+def bench_stages(engine: str, seconds: float, repeat: int) -> dict:
+    """Best-of-``repeat`` wall time of each DSP stage over ``seconds`` of stereo input."""
+    gen.ENGINE = engine
+    frames = int(gen.SR * seconds)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runners = stage_runners(seconds, tmp_dir)
+        for stage in STAGES:
+            best = math.inf
+            for _ in range(repeat):
+                start = time.perf_counter()
+                runners[stage]()
+                best = min(best, time.perf_counter() - start)
+            results[stage] = {"wall_s": best, "frames": frames, "samples_per_s": frames / best if best > 0 else 0.0}
+            print(f"  {stage:22} {best:8.3f} s {frames / best / 1e3:10.1f} kframes/s")
+    return results
+
+
+def format_mb(mb) -> str:
+    return "" if mb is None else f"{mb:8.1f} MB"
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print per-entry changes against ``baseline`` and return the entries slower than ``tolerance``."""
+    regressions = []
+    for section in ("recipes", "stages"):
+        for name, cur in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if not old or not old.get("wall_s"):
+                continue
+            ratio = cur["wall_s"] / old["wall_s"]
+            note = ""
+            if ratio > 1.0 + tolerance:
+                note = "  SLOWER"
+                regressions.append(f"{section}.{name}")
+            elif ratio < 1.0 - tolerance:
+                note = "  faster"
+            rss = ""
+            if cur.get("peak_rss_mb") and old.get("peak_rss_mb"):
+                rss = f"  rss {old['peak_rss_mb']:.1f} -> {cur['peak_rss_mb']:.1f} MB"
+            print(f"  {section}.{name:22} {old['wall_s']:8.3f} -> {cur['wall_s']:8.3f} s  x{ratio:5.2f}{rss}{note}")
+    return regressions
+
+
+def read_pcm(path: str):
+    """Decode a 16-bit PCM WAV into an int array of shape (frames, channels)."""
+    with wave.open(path) as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: golden checks need 16-bit PCM")
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return data.astype(np.int64).reshape(-1, w.getnchannels()), w.getframerate()
+
+
+def band_levels(x, sr: int):
+    """Level in dB of each SPECTRAL_BANDS band of the Hann-windowed, frame-averaged power spectrum."""
+    x = np.asarray(x, dtype=np.float64) / 32768.0
+    if len(x) < SPECTRUM_FRAME:
+        x = np.pad(x, (0, SPECTRUM_FRAME - len(x)))
+    frames = np.lib.stride_tricks.sliding_window_view(x, SPECTRUM_FRAME)[::SPECTRUM_FRAME // 2]
+    power = (np.abs(np.fft.rfft(frames * np.hanning(SPECTRUM_FRAME), axis=1)) ** 2).mean(axis=0)
+    freqs = np.fft.rfftfreq(SPECTRUM_FRAME, 1.0 / sr)
+    edges = list(SPECTRAL_BANDS) + [sr / 2.0 + 1.0]
+    return np.array([10.0 * np.log10(power[(freqs >= lo) & (freqs < hi)].sum() + 1e-20) for lo, hi in zip(edges, edges[1:])])
+
+
+def bank_variants(bank_dir: str, index: dict) -> dict:
+    """The SFX bank described by ``index`` as ``{name: (samples, rate)}``, decoded like read_pcm.
+
+    Empty when the index has no bank or the bank file is missing.
+    """
+    bank_path = os.path.join(bank_dir, index.get("bank", {}).get("file", gen.SFX_BANK_FILE))
+    if "bank" not in index or not os.path.exists(bank_path):
+        return {}
+    data = np.fromfile(bank_path, dtype="<i2").astype(np.int64)
+    variants = {}
+    for entries in index["sfx"].values():
+        for entry in entries:
+            channels = entry["channels"]
+            start = entry["byte_offset"] // 2
+            samples = data[start:start + entry["frames"] * channels]
+            # A truncated bank keeps its whole frames and fails the shape check.
+            samples = samples[:len(samples) - len(samples) % channels]
+            variants[entry["name"]] = (samples.reshape(-1, channels), entry["mix_rate"])
+    return variants
+
+
+def pcm_diff(a, sr_a: int, b, sr_b: int) -> dict:
+    """Worst per-sample difference (LSB) and worst per-band level difference (dB) of two decoded signals."""
+    if a.shape != b.shape or sr_a != sr_b:
+        return {"error": f"shape {a.shape} @ {sr_a} Hz vs {b.shape} @ {sr_b} Hz"}
+    sample = int(np.abs(a - b).max()) if a.size else 0
+    spectral = 0.0
+    for c in range(a.shape[1]):
+        la = band_levels(a[:, c], sr_a)
+        lb = band_levels(b[:, c], sr_b)
+        audible = lb > lb.max() - SPECTRAL_FLOOR_DB
+        if audible.any():
+            spectral = max(spectral, float(np.abs(la - lb)[audible].max()))
+    return {"sample_lsb": sample, "spectral_db": spectral}
+
+
+def golden_diff(candidate: str, reference: str) -> dict:
+    """pcm_diff of two WAVs."""
+    return pcm_diff(*read_pcm(candidate), *read_pcm(reference))
+
+
+def report_diff(name: str, diff: dict) -> bool:
+    """Print one golden result and return whether it is within tolerance."""
+    if "error" in diff:
+        passed = False
+        detail = diff["error"]
+    else:
+        passed = diff["sample_lsb"] <= SAMPLE_TOLERANCE and diff["spectral_db"] <= SPECTRAL_TOLERANCE_DB
+        detail = f"max {diff['sample_lsb']} LSB, {diff['spectral_db']:.4f} dB"
+    print(f"  {name:22} {'ok  ' if passed else 'FAIL'} {detail}")
+    return passed
+
+
+def golden_check(engine: str, names, reference_dir: str) -> bool:
+    """Render ``names`` on ``engine`` and compare against reference-engine renders in ``reference_dir``.
+
+    Reference files already in ``reference_dir`` are reused, so a kept directory
+    makes repeated checks cost only the candidate render.
+    """
+    ok = True
+    with tempfile.TemporaryDirectory() as cand_dir:
+        for name in names:
+            ref_path = os.path.join(reference_dir, name + ".wav")
+            if not os.path.exists(ref_path):
+                gen.render_recipe(REFERENCE_ENGINE, name, reference_dir, "pcm16")
+            gen.render_recipe(engine, name, cand_dir, "pcm16")
+            diff = golden_diff(os.path.join(cand_dir, name + ".wav"), ref_path)
+            ok = report_diff(name, diff) and ok
+    return ok
+
+
+def reference_check(engine: str, names, reference_dir: str) -> bool:
+    """Compare ``engine`` renders of ``names`` with frozen assets in ``reference_dir``.
+
+    Nothing is rendered into ``reference_dir``. The expected output of a recipe
+    is ``<name>.wav`` there (from ``--format pcm16 --out-dir`` of a known-good
+    revision) or else its variant in the SFX bank there, which the candidate's
+    own bank render is compared with. Recipes without either are skipped; a run
+    that compares nothing fails.
+    """
+    reference_bank = bank_variants(reference_dir, gen.read_sfx_index(reference_dir))
+    candidate_bank = None
+    compared = 0
+    ok = True
+    with tempfile.TemporaryDirectory() as cand_dir:
+        for name in names:
+            ref_path = os.path.join(reference_dir, name + ".wav")
+            if os.path.exists(ref_path):
+                gen.render_recipe(engine, name, cand_dir, "pcm16")
+                diff = golden_diff(os.path.join(cand_dir, name + ".wav"), ref_path)
+            elif name in reference_bank:
+                if candidate_bank is None:
+                    entries, _ = gen.render_bank(engine, cand_dir)
+                    candidate_bank = bank_variants(cand_dir, gen.sfx_index(entries))
+                if name not in candidate_bank:
+                    diff = {"error": "not in the rendered bank"}
+                else:
+                    diff = pcm_diff(*candidate_bank[name], *reference_bank[name])
+            else:
+                print(f"  {name:22} skip no reference")
+                continue
+            compared += 1
+            ok = report_diff(name, diff) and ok
+    if not compared:
+        print(f"  no reference assets for the selected recipes in {reference_dir}")
+    return ok and compared > 0
+
+
+def decode_ima_adpcm(path: str):
+    """Decode an IMA-ADPCM WAV into ``(planes, frames, fmt)``, independently of the encoder.
+
+    ``fmt`` holds the fields of the ``fmt `` chunk; ``frames`` is the ``fact`` count.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    chunks = {}
+    pos = 12
+    while pos + 8 <= len(data):
+        tag, size = struct.unpack_from("<4sI", data, pos)
+        chunks[tag] = data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)
+    tag, channels, rate, byte_rate, block_align, bits, extra, block_samples = struct.unpack("<HHIIHHHH", chunks[b"fmt "])
+    fmt = {"tag": tag, "channels": channels, "rate": rate, "block_align": block_align, "bits": bits, "block_samples": block_samples}
+    (frames,) = struct.unpack("<I", chunks[b"fact"])
+    planes = [[] for _ in range(channels)]
+    payload = chunks[b"data"]
+    for block in range(0, len(payload), block_align):
+        raw = payload[block:block + block_align]
+        state = []
+        for c in range(channels):
+            pred, index, _ = struct.unpack_from("<hBB", raw, 4 * c)
+            planes[c].append(pred)
+            state.append([pred, index])
+        words = raw[4 * channels:]
+        for w in range(0, len(words), 4 * channels):
+            for c in range(channels):
+                for byte in words[w + 4 * c:w + 4 * c + 4]:
+                    for nibble in (byte & 15, byte >> 4):
+                        pred, index = state[c]
+                        step = gen.IMA_STEP_TABLE[index]
+                        diff = step >> 3
+                        if nibble & 4:
+                            diff += step
+                        if nibble & 2:
+                            diff += step >> 1
+                        if nibble & 1:
+                            diff += step >> 2
+                        pred = max(-32768, min(32767, pred - diff if nibble & 8 else pred + diff))
+                        state[c] = [pred, min(88, max(0, index + gen.IMA_INDEX_TABLE[nibble]))]
+                        planes[c].append(pred)
+    return [p[:frames] for p in planes], frames, fmt
+
+
+def self_test_uniform_noise():
+    # uniform_noise must consume the Mersenne Twister exactly like n rng.uniform(-1, 1) calls.
+    for n in (0, 1, 2, 7, 1000):
+        a = random.Random(n)
+        b = random.Random(n)
+        assert gen.uniform_noise(a, n).tolist() == [b.uniform(-1.0, 1.0) for _ in range(n)], n
+        assert a.getstate() == b.getstate(), n
+
+
+def self_test_ima_adpcm():
+    # Standard IMA tables; a changed entry would still decode, just worse.
+    assert len(gen.IMA_STEP_TABLE) == 89 and gen.IMA_STEP_TABLE[0] == 7 and gen.IMA_STEP_TABLE[-1] == 32767
+    assert gen.IMA_INDEX_TABLE == (-1, -1, -1, -1, 2, 4, 6, 8) * 2
+    sr = 22050
+    frames = 3 * gen.IMA_BLOCK_SAMPLES + 5
+    t = np.arange(frames) / sr
+    left = 0.5 * np.sin(2.0 * math.pi * 440.0 * t)
+    right = 0.3 * np.sin(2.0 * math.pi * 1500.0 * t) * np.linspace(1.0, 0.0, frames)
+    # Odd block sizes exercise the carry of pending frames between IMA blocks.
+    blocks = [gen.SampleBuffer.of(left[i:i + 700], right[i:i + 700]) for i in range(0, frames, 700)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "ima.wav")
+        gen.write_wav_ima_adpcm(path, blocks, sr)
+        planes, decoded_frames, fmt = decode_ima_adpcm(path)
+    assert fmt == {"tag": 0x11, "channels": 2, "rate": sr, "block_align": 2 * gen.IMA_CHANNEL_BLOCK, "bits": 4,
+                   "block_samples": gen.IMA_BLOCK_SAMPLES}, fmt
+    assert decoded_frames == frames and all(len(p) == frames for p in planes)
+    for source, plane in zip(gen.pcm16_planes((left, right)), planes):
+        source = np.array(source, dtype=np.float64)
+        plane = np.array(plane, dtype=np.float64)
+        # Every block starts from an exact sample in its header.
+        assert (plane[::gen.IMA_BLOCK_SAMPLES] == source[::gen.IMA_BLOCK_SAMPLES]).all()
+        # The step index starts at 0, so the first block is still slewing up to the signal.
+        source = source[gen.IMA_BLOCK_SAMPLES:]
+        error = source - plane[gen.IMA_BLOCK_SAMPLES:]
+        snr = 10.0 * math.log10(np.dot(source, source) / np.dot(error, error))
+        assert snr > 24.0, f"SNR {snr:.1f} dB"
+
+
+def self_test_fir_filter():
+    rng = random.Random(0)
+    x = [rng.uniform(-1.0, 1.0) for _ in range(3001)]
+    for factor, taps in ((1, gen.highpass_taps(2)), (2, gen.lowpass_taps(2)), (4, gen.lowpass_taps(4))):
+        assert abs(sum(gen.lowpass_taps(factor)) - 1.0) < 1e-12
+        assert max(abs(a - b) for a, b in zip(taps, reversed(taps))) < 1e-15, "taps are not linear-phase"
+        delay = (len(taps) - 1) // 2
+        # Delay-compensated convolution with silence on both sides, every factor-th output kept.
+        expected = np.convolve(x, taps)[delay:delay + len(x)][::factor]
+        for engine in ("numpy", "python"):
+            gen.ENGINE = engine
+            fir = gen.FirFilter(taps, factor)
+            out = []
+            start = 0
+            for size in (1, 2, 37, 64, 129, 500, 1000):
+                out.extend(fir.process(np.array(x[start:start + size]) if engine == "numpy" else x[start:start + size]))
+                start += size
+            out.extend(fir.process(np.array(x[start:]) if engine == "numpy" else x[start:], final=True))
+            assert len(out) == len(expected), (engine, factor, len(out))
+            assert np.abs(np.array(out) - expected).max() < 1e-12, (engine, factor)
+    # Highpass and lowpass split a signal into parts that add back up to it.
+    low = np.convolve(x, gen.lowpass_taps(2))
+    high = np.convolve(x, gen.highpass_taps(2))
+    delay = (gen.RESAMPLE_TAPS - 1) // 2
+    assert np.abs((low + high)[delay:delay + len(x)] - x).max() < 1e-12
+
+
+def self_test_fx_chain():
+    # A Patch recipe without AutoPan is centre-panned, exactly like one that starts with AutoPan().
+    chains = {
+        "none": ((), (gen.AutoPan(),)),
+        "limiter": ((gen.Limiter(0.8),), (gen.AutoPan(), gen.Limiter(0.8))),
+        "delay": ((gen.FeedbackDelay(0.01, 0.3, 0.3),), (gen.AutoPan(), gen.FeedbackDelay(0.01, 0.3, 0.3))),
+    }
+    saved = dict(gen.RECIPES)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for engine in ("numpy", "python"):
+                for label, (fx, panned) in chains.items():
+                    gen.RECIPES["self_test_bare"] = gen.Recipe(gen.make_click, fx=fx, channels=2, rate=gen.SR)
+                    gen.RECIPES["self_test_panned"] = gen.Recipe(gen.make_click, fx=panned, channels=2, rate=gen.SR)
+                    gen.render_recipe(engine, "self_test_bare", tmp_dir, "pcm16")
+                    gen.render_recipe(engine, "self_test_panned", tmp_dir, "pcm16")
+                    bare, _ = read_pcm(os.path.join(tmp_dir, "self_test_bare.wav"))
+                    panned_pcm, _ = read_pcm(os.path.join(tmp_dir, "self_test_panned.wav"))
+                    assert bare.shape[1] == 2 and bare.any(), (engine, label)
+                    assert (bare == panned_pcm).all(), (engine, label)
+    finally:
+        gen.RECIPES.clear()
+        gen.RECIPES.update(saved)
+    try:
+        gen.Recipe(gen.make_click, fx=(gen.Limiter(),) + (gen.AutoPan(),))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("AutoPan after another effect was accepted")
+
+
+SELF_TESTS = (self_test_uniform_noise, self_test_ima_adpcm, self_test_fir_filter, self_test_fx_chain)
+
+
+def self_test() -> bool:
+    """Run SELF_TESTS, printing one line each, and return whether all passed."""
+    engine = gen.ENGINE
+    ok = True
+    for test in SELF_TESTS:
+        passed = True
+        detail = ""
+        try:
+            test()
+        except AssertionError as exc:
+            passed = False
+            detail = str(exc)
+        finally:
+            gen.ENGINE = engine
+        ok = ok and passed
+        print(f"  {test.__name__[len('self_test_'):]:22} {'ok  ' if passed else 'FAIL'} {detail}".rstrip())
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio generator and check its output against the reference engine.")
+    parser.add_argument(
+        "--engine",
+        choices=("numpy", "python"),
+        default=gen.ENGINE,
+        help="engine to benchmark or check (default: numpy when available)",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="PATTERN",
+        help="benchmark only recipes whose name matches this glob; repeatable",
+    )
+    parser.add_argument("--skip-recipes", action="store_true", help="only time the DSP stages")
+    parser.add_argument("--skip-stages", action="store_true", help="only time the recipes")
+    parser.add_argument("--repeat", type=int, default=3, help="stage timings keep the best of N runs (default: 3)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with (default: .audio_bench.json)")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative slowdown reported as a regression (default: 0.15)")
+    parser.add_argument("--strict", action="store_true", help="exit non-zero when a regression is reported")
+    parser.add_argument("--golden", action="store_true", help="compare --engine output with the per-sample reference engine instead of timing")
+    parser.add_argument("--golden-dir", help="keep reference renders here and reuse them on later runs")
+    parser.add_argument(
+        "--reference",
+        nargs="?",
+        const=gen.OUT_DIR,
+        metavar="DIR",
+        help="compare --engine output with frozen assets in DIR instead of timing "
+        "(default DIR: assets/audio, i.e. the committed SFX bank)",
+    )
+    parser.add_argument("--self-test", action="store_true", help="run assertion checks of the noise, IMA-ADPCM, FIR and FX chain code, then exit")
+    args = parser.parse_args()
+    if args.engine == "numpy" and np is None:
+        parser.error("--engine numpy requires NumPy")
+
+    if args.self_test:
+        if np is None:
+            parser.error("--self-test requires NumPy")
+        print("self-test:")
+        sys.exit(0 if self_test() else 1)
+
+    names = gen.select_recipes(args.only)
+    if not names:
+        parser.error("no recipe matches " + ", ".join(args.only))
+
+    if args.reference:
+        if np is None:
+            parser.error("--reference requires NumPy for decoding and spectra")
+        print(f"reference check: {args.engine} vs {args.reference}")
+        sys.exit(0 if reference_check(args.engine, names, args.reference) else 1)
+
+    if args.golden:
+        if np is None:
+            parser.error("--golden requires NumPy for decoding and spectra")
+        print(f"golden check: {args.engine} vs {REFERENCE_ENGINE}")
+        if args.golden_dir:
+            os.makedirs(args.golden_dir, exist_ok=True)
+            ok = golden_check(args.engine, names, args.golden_dir)
+        else:
+            with tempfile.TemporaryDirectory() as ref_dir:
+                ok = golden_check(args.engine, names, ref_dir)
+        sys.exit(0 if ok else 1)
+
+    results = {
+        "engine": args.engine,
+        "python": platform.python_version(),
+        "numpy": np.__version__ if np is not None else None,
+        "recipes": {},
+        "stages": {},
+    }
+    if not args.skip_recipes:
+        print(f"recipes ({args.engine}):")
+        with tempfile.TemporaryDirectory() as out_dir:
+            results["recipes"] = bench_recipes(args.engine, names, out_dir)
+    if not args.skip_stages:
+        print(f"stages ({args.engine}, {STAGE_SECONDS:g} s stereo):")
+        results["stages"] = bench_stages(args.engine, STAGE_SECONDS, args.repeat)
+
+    regressions = []
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = None
+    if baseline and baseline.get("engine") == args.engine:
+        print(f"vs baseline {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance)
+    elif baseline:
+        print(f"baseline {args.baseline} is for the {baseline.get('engine')} engine; not compared")
+    if args.save or baseline is None:
+        if baseline and baseline.get("engine") == args.engine:
+            # Partial runs (--only, --skip-*) only replace the entries they measured.
+            for section in ("recipes", "stages"):
+                results[section] = {**baseline.get(section, {}), **results[section]}
+        gen.write_json_if_changed(args.baseline, results)
+        print(f"wrote baseline {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: " + ", ".join(regressions))
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,16 @@ ensure_templates_for_target() {
   fi
 }
 
+generate_audio() {
+  if command -v python3 >/dev/null 2>&1; then
+    echo "[build] audio assets"
+    python3 "$ROOT_DIR/scripts/generate_audio_assets.py" --jobs 0
+  else
+    echo "[build] python3 not found, using committed audio assets"
+  fi
+}
+
+generate_audio
 "$ROOT_DIR/scripts/smoke_test.sh"
 ensure_templates_for_target "$TARGETS"
 
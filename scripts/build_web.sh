@@ -5,6 +5,10 @@ ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
 GODOT_BIN="${GODOT_BIN:-/Users/bj/Downloads/Godot.app/Contents/MacOS/Godot}"
 OUT_PATH="${1:-$ROOT_DIR/build/web/index.html}"
 
+if command -v python3 >/dev/null 2>&1; then
+  python3 "$ROOT_DIR/scripts/generate_audio_assets.py" --jobs 0
+fi
+
 mkdir -p "$(dirname "$OUT_PATH")"
 "$GODOT_BIN" --headless --path "$ROOT_DIR" --export-release "Web" "$OUT_PATH"
 
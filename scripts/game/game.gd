@@ -9,6 +9,7 @@ const ProjectileScript = preload("res://scripts/entities/projectile.gd")
 const XpOrbScript = preload("res://scripts/entities/xp_orb.gd")
 const DataScript = preload("res://scripts/game/data.gd")
 const FxOverlayScript = preload("res://scripts/game/fx_overlay.gd")
+const SfxLibraryScript = preload("res://scripts/game/sfx_library.gd")
 
 const ARENA_SIZE = Vector2(2200, 1300)
 const RUN_DURATION = 1020.0
@@ -52,58 +53,6 @@ const AMBIENT_PATHS = {
 	"umbra_vault": "res://assets/audio/ambient_umbra_vault.wav",
 	"endless": "res://assets/audio/ambient_endless.wav"
 }
-const SFX_PATHS = {
-	# Repetitive SFX use small variant pools.
-	"shotgun": [
-		"res://assets/audio/sfx_shotgun.wav",
-		"res://assets/audio/sfx_shotgun_2.wav",
-		"res://assets/audio/sfx_shotgun_3.wav"
-	],
-	"beam": [
-		"res://assets/audio/sfx_beam.wav",
-		"res://assets/audio/sfx_beam_2.wav",
-		"res://assets/audio/sfx_beam_3.wav"
-	],
-	"boomerang": [
-		"res://assets/audio/sfx_boomerang.wav",
-		"res://assets/audio/sfx_boomerang_2.wav",
-		"res://assets/audio/sfx_boomerang_3.wav"
-	],
-	"surge": "res://assets/audio/sfx_surge.wav",
-	"hurt": [
-		"res://assets/audio/sfx_hurt.wav",
-		"res://assets/audio/sfx_hurt_2.wav"
-	],
-	"hit": [
-		"res://assets/audio/sfx_hit.wav",
-		"res://assets/audio/sfx_hit_2.wav",
-		"res://assets/audio/sfx_hit_3.wav"
-	],
-	"crit": [
-		"res://assets/audio/sfx_crit.wav",
-		"res://assets/audio/sfx_crit_2.wav"
-	],
-	"levelup": [
-		"res://assets/audio/sfx_levelup.wav",
-		"res://assets/audio/sfx_levelup_2.wav",
-		"res://assets/audio/sfx_levelup_3.wav"
-	],
-	"enemy_die": [
-		"res://assets/audio/sfx_enemy_die.wav",
-		"res://assets/audio/sfx_enemy_die_2.wav",
-		"res://assets/audio/sfx_enemy_die_3.wav"
-	],
-	"boss_roar": "res://assets/audio/sfx_boss_roar.wav",
-	"boss_slam": "res://assets/audio/sfx_boss_slam.wav",
-	"boss_die": "res://assets/audio/sfx_boss_die.wav",
-	"step": [
-		"res://assets/audio/sfx_step.wav",
-		"res://assets/audio/sfx_step_2.wav",
-		"res://assets/audio/sfx_step_3.wav"
-	],
-	"ui_click": "res://assets/audio/sfx_click.wav",
-	"death": "res://assets/audio/sfx_death.wav"
-}
 
 const UPGRADES = [
 	{"id": "damage", "title": "Kinetic Core", "desc": "+16% base damage"},
@@ -617,20 +566,9 @@ func _build_audio() -> void:
 		ambient_player.play()
 
 	sfx_streams.clear()
-	for sfx_name in SFX_PATHS.keys():
-		var entry = SFX_PATHS[sfx_name]
-		var paths: Array = []
-		if typeof(entry) == TYPE_ARRAY:
-			paths = entry
-		else:
-			paths = [String(entry)]
-
-		var streams: Array = []
-		for p in paths:
-			var sfx_path = String(p)
-			if sfx_path != "" and ResourceLoader.exists(sfx_path):
-				streams.append(load(sfx_path))
-
+	var sfx_groups = SfxLibraryScript.load_groups()
+	for sfx_name in sfx_groups.keys():
+		var streams: Array = sfx_groups[sfx_name]
 		if not streams.is_empty():
 			sfx_streams[sfx_name] = streams
 
@@ -0,0 +1,104 @@
+extends RefCounted
+class_name BluethSfxLibrary
+
+# Variant pools are written by scripts/generate_audio_assets.py (one entry per recipe group).
+const INDEX_PATH = "res://assets/audio/sfx_index.json"
+
+# load_groups() results by index path, so the bank is read and sliced once per run.
+static var _groups_cache: Dictionary = {}
+
+
+# Returns {group name: Array of AudioStream}. Entries are either WAV file names or,
+# in the packed layout, frame ranges of one raw PCM bank that is read once and sliced.
+static func load_groups(index_path: String = INDEX_PATH) -> Dictionary:
+	if _groups_cache.has(index_path):
+		return _groups_cache[index_path]
+	var result = {}
+	var parsed = _read_index(index_path)
+	if parsed.is_empty():
+		return result
+	var base_dir = index_path.get_base_dir()
+	var bank: PackedByteArray = PackedByteArray()
+	var bank_info = parsed.get("bank")
+	if typeof(bank_info) == TYPE_DICTIONARY:
+		var bank_path = base_dir.path_join(String(bank_info.get("file", "")))
+		if FileAccess.file_exists(bank_path):
+			bank = FileAccess.get_file_as_bytes(bank_path)
+	var groups: Dictionary = parsed["sfx"]
+	for sfx_name in groups.keys():
+		var streams: Array = []
+		for entry in groups[sfx_name]:
+			if typeof(entry) == TYPE_DICTIONARY:
+				if not bank.is_empty():
+					var start = int(entry.get("byte_offset", 0))
+					var sliced = _bank_stream(bank.slice(start, start + _byte_count(bank_info, entry)), bank_info, entry)
+					if sliced != null:
+						streams.append(sliced)
+				continue
+			var sfx_path = base_dir.path_join(String(entry))
+			if ResourceLoader.exists(sfx_path):
+				streams.append(load(sfx_path))
+		result[sfx_name] = streams
+	_groups_cache[index_path] = result
+	return result
+
+
+# Streams of a single group. Unless load_groups() already ran, only that group's
+# byte ranges of the bank are read, e.g. for the menu's click sound.
+static func load_group(sfx_name: String, index_path: String = INDEX_PATH) -> Array:
+	if _groups_cache.has(index_path):
+		return _groups_cache[index_path].get(sfx_name, [])
+	var streams: Array = []
+	var parsed = _read_index(index_path)
+	if parsed.is_empty():
+		return streams
+	var entries = parsed["sfx"].get(sfx_name, [])
+	if typeof(entries) != TYPE_ARRAY:
+		return streams
+	var base_dir = index_path.get_base_dir()
+	var bank_info = parsed.get("bank")
+	var bank_file: FileAccess = null
+	if typeof(bank_info) == TYPE_DICTIONARY:
+		bank_file = FileAccess.open(base_dir.path_join(String(bank_info.get("file", ""))), FileAccess.READ)
+	for entry in entries:
+		if typeof(entry) == TYPE_DICTIONARY:
+			if bank_file != null:
+				var start = int(entry.get("byte_offset", 0))
+				var count = _byte_count(bank_info, entry)
+				if count > 0 and start + count <= bank_file.get_length():
+					bank_file.seek(start)
+					var stream = _bank_stream(bank_file.get_buffer(count), bank_info, entry)
+					if stream != null:
+						streams.append(stream)
+			continue
+		var sfx_path = base_dir.path_join(String(entry))
+		if ResourceLoader.exists(sfx_path):
+			streams.append(load(sfx_path))
+	return streams
+
+
+static func _read_index(index_path: String) -> Dictionary:
+	if not FileAccess.file_exists(index_path):
+		return {}
+	var parsed = JSON.parse_string(FileAccess.get_file_as_string(index_path))
+	if typeof(parsed) != TYPE_DICTIONARY or typeof(parsed.get("sfx")) != TYPE_DICTIONARY:
+		return {}
+	return parsed
+
+
+static func _byte_count(info: Dictionary, entry: Dictionary) -> int:
+	# Each variant carries its own channel count and rate; the bank defaults cover older indexes.
+	return int(entry.get("frames", 0)) * 2 * int(entry.get("channels", info.get("channels", 2)))
+
+
+# An AudioStreamWAV over one variant's bytes, or null when the range was cut short.
+static func _bank_stream(data: PackedByteArray, info: Dictionary, entry: Dictionary) -> AudioStreamWAV:
+	var count = _byte_count(info, entry)
+	if count <= 0 or data.size() != count:
+		return null
+	var stream = AudioStreamWAV.new()
+	stream.format = AudioStreamWAV.FORMAT_16_BITS
+	stream.mix_rate = int(entry.get("mix_rate", info.get("mix_rate", 44100)))
+	stream.stereo = int(entry.get("channels", info.get("channels", 2))) == 2
+	stream.data = data
+	return stream
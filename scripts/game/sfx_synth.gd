@@ -0,0 +1,205 @@
+extends RefCounted
+class_name BluethSfxSynth
+
+# Runtime counterpart of render_patch and the FX chain in scripts/generate_audio_assets.py,
+# driven by the sfx_patches.json it exports. Noise comes from Godot's RNG, so a render has the
+# shape of the shipped variant, not its exact samples.
+const PATCHES_PATH = "res://assets/audio/sfx_patches.json"
+const SOFTCLIP_DRIVE = 1.7
+
+
+# Returns {group name: {"patch", "params", "fx", "ranges", "slopes"}}.
+static func load_patches(path: String = PATCHES_PATH) -> Dictionary:
+	if not FileAccess.file_exists(path):
+		return {}
+	var parsed = JSON.parse_string(FileAccess.get_file_as_string(path))
+	if typeof(parsed) != TYPE_DICTIONARY or typeof(parsed.get("sfx")) != TYPE_DICTIONARY:
+		return {}
+	return parsed["sfx"]
+
+
+# A new variant of a group: every ranged parameter (detune, transpose) drawn uniformly
+# inside the range the pre-rendered variants span, applied through its slopes.
+static func random_patch(group: Dictionary, rng: RandomNumberGenerator) -> Dictionary:
+	var patch: Dictionary = group.get("patch", {}).duplicate(true)
+	var params: Dictionary = group.get("params", {})
+	var ranges: Dictionary = group.get("ranges", {})
+	var slopes: Dictionary = group.get("slopes", {})
+	for param in ranges.keys():
+		var span: Array = ranges[param]
+		var amount = rng.randf_range(float(span[0]), float(span[1])) - float(params.get(param, 0.0))
+		_shift(patch, slopes.get(param, {}), amount)
+	return patch
+
+
+# Renders one random variant of a group to 16-bit stereo, for caching on first use.
+static func render_stream(group: Dictionary, rng: RandomNumberGenerator, mix_rate: int = 44100) -> AudioStreamWAV:
+	return to_wav(render_frames(group, rng, mix_rate), mix_rate)
+
+
+# Renders one random variant of a group as stereo frames, e.g. for an AudioStreamGenerator.
+static func render_frames(group: Dictionary, rng: RandomNumberGenerator, mix_rate: int = 44100) -> PackedVector2Array:
+	var voice = render_voice(random_patch(group, rng), rng, mix_rate)
+	return apply_fx(voice, group.get("fx", []), mix_rate)
+
+
+# Pushes as many frames as the generator has room for, starting at from_frame.
+# Returns the next frame to push; call again from _process until it reaches frames.size().
+static func push_frames(playback: AudioStreamGeneratorPlayback, frames: PackedVector2Array, from_frame: int) -> int:
+	var count = min(playback.get_frames_available(), frames.size() - from_frame)
+	if count > 0:
+		playback.push_buffer(frames.slice(from_frame, from_frame + count))
+	return from_frame + max(count, 0)
+
+
+# Mono voice of a patch: sine partials plus uniform noise under one ADSR envelope.
+static func render_voice(patch: Dictionary, rng: RandomNumberGenerator, mix_rate: int) -> PackedFloat32Array:
+	var dur = float(patch.get("dur", 0.0))
+	var adsr: Array = patch.get("adsr", [0.0, 0.0, 1.0, 0.0])
+	var partials: Array = patch.get("partials", [])
+	var noise_gain = float(patch.get("noise", 0.0))
+	var noise_decay: Array = patch.get("noise_decay", [])
+	var frames = int(mix_rate * dur)
+	var out = PackedFloat32Array()
+	out.resize(frames)
+	if frames == 0:
+		return out
+
+	# Phases in cycles, like the Python OscBank.
+	var phases = PackedFloat64Array()
+	var lfo_phases = PackedFloat64Array()
+	for partial in partials:
+		phases.append(float(partial.get("phase", 0.0)) / TAU)
+		lfo_phases.append(0.0)
+
+	for i in range(frames):
+		var t = float(i) / mix_rate
+		var x = t / dur
+		var mix = 0.0
+		for v in range(partials.size()):
+			var partial: Dictionary = partials[v]
+			var f = float(partial["hz"]) + float(partial.get("sweep", 0.0)) * x
+			var vibrato: Array = partial.get("vibrato", [])
+			if vibrato.size() == 2:
+				f += float(vibrato[1]) * sin(TAU * lfo_phases[v])
+				lfo_phases[v] = fposmod(lfo_phases[v] + float(vibrato[0]) / mix_rate, 1.0)
+			var floor_hz = float(partial.get("floor", 0.0))
+			if floor_hz != 0.0:
+				f = max(floor_hz, f)
+			var tone = sin(TAU * phases[v])
+			phases[v] = fposmod(phases[v] + f / mix_rate, 1.0)
+			var decay: Array = partial.get("decay", [])
+			if decay.size() == 2:
+				tone *= exp_env(t, float(decay[0]), float(decay[1]))
+			mix += tone * float(partial["gain"])
+		if noise_gain != 0.0:
+			var grit = rng.randf_range(-1.0, 1.0) * noise_gain
+			if noise_decay.size() == 2:
+				grit *= exp_env(t, float(noise_decay[0]), float(noise_decay[1]))
+			mix += grit
+		out[i] = mix * env_adsr(t, dur, float(adsr[0]), float(adsr[1]), float(adsr[2]), float(adsr[3]))
+	return out
+
+
+# Runs a mono voice through an exported FX chain (AutoPan, FeedbackDelay, Limiter).
+# Without an AutoPan the voice is panned to the centre, as mono_to_stereo does at width 0.
+static func apply_fx(voice: PackedFloat32Array, fx: Array, mix_rate: int) -> PackedVector2Array:
+	var frames = PackedVector2Array()
+	frames.resize(voice.size())
+	for i in range(voice.size()):
+		frames[i] = Vector2(voice[i], voice[i]) * sqrt(0.5)
+	for effect in fx:
+		match String(effect.get("type", "")):
+			"AutoPan":
+				frames = _auto_pan(voice, float(effect.get("width", 0.0)), float(effect.get("lfo_hz", 0.0)), mix_rate)
+			"FeedbackDelay":
+				frames = _feedback_delay(frames, float(effect["seconds"]), float(effect["feedback"]), float(effect["mix"]), mix_rate)
+			"Limiter":
+				frames = _limit(frames, float(effect.get("peak", 0.92)))
+			_:
+				push_warning("BluethSfxSynth: unknown effect %s" % effect.get("type"))
+	return frames
+
+
+static func to_wav(frames: PackedVector2Array, mix_rate: int) -> AudioStreamWAV:
+	var data = PackedByteArray()
+	data.resize(frames.size() * 4)
+	for i in range(frames.size()):
+		# Same truncation toward zero as the Python writer.
+		data.encode_s16(i * 4, int(clamp(frames[i].x, -1.0, 1.0) * 32767.0))
+		data.encode_s16(i * 4 + 2, int(clamp(frames[i].y, -1.0, 1.0) * 32767.0))
+	var stream = AudioStreamWAV.new()
+	stream.format = AudioStreamWAV.FORMAT_16_BITS
+	stream.mix_rate = mix_rate
+	stream.stereo = true
+	stream.data = data
+	return stream
+
+
+static func env_adsr(t: float, dur: float, a: float, d: float, s: float, r: float) -> float:
+	if t < 0.0:
+		return 0.0
+	if t < a:
+		return t / max(1e-6, a)
+	if t < a + d:
+		return 1.0 - (1.0 - s) * ((t - a) / max(1e-6, d))
+	if t < dur - r:
+		return s
+	if t < dur:
+		return s * (1.0 - (t - (dur - r)) / max(1e-6, r))
+	return 0.0
+
+
+static func exp_env(t: float, dur: float, power: float) -> float:
+	if t < 0.0 or t >= dur:
+		return 0.0
+	return pow(max(0.0, 1.0 - t / dur), power)
+
+
+static func _auto_pan(voice: PackedFloat32Array, width: float, lfo_hz: float, mix_rate: int) -> PackedVector2Array:
+	var frames = PackedVector2Array()
+	frames.resize(voice.size())
+	for i in range(voice.size()):
+		var pan = 0.0
+		if lfo_hz > 0.0 and width > 0.0:
+			pan = clamp(sin(TAU * lfo_hz * (float(i) / mix_rate)) * width, -1.0, 1.0)
+		frames[i] = Vector2(voice[i] * sqrt((1.0 - pan) * 0.5), voice[i] * sqrt((1.0 + pan) * 0.5))
+	return frames
+
+
+static func _feedback_delay(frames: PackedVector2Array, seconds: float, feedback: float, mix: float, mix_rate: int) -> PackedVector2Array:
+	var ring = PackedVector2Array()
+	ring.resize(max(1, int(seconds * mix_rate)))
+	var pos = 0
+	for i in range(frames.size()):
+		var dry = frames[i]
+		var out = dry * (1.0 - mix) + (dry + ring[pos] * feedback) * mix
+		ring[pos] = out
+		pos = (pos + 1) % ring.size()
+		frames[i] = out
+	return frames
+
+
+static func _limit(frames: PackedVector2Array, peak: float) -> PackedVector2Array:
+	var max_val = 1e-6
+	for frame in frames:
+		max_val = max(max_val, max(abs(frame.x), abs(frame.y)))
+	var scale = peak / max_val
+	var norm = tanh(SOFTCLIP_DRIVE)
+	for i in range(frames.size()):
+		var v = frames[i] * scale
+		frames[i] = Vector2(tanh(v.x * SOFTCLIP_DRIVE) / norm, tanh(v.y * SOFTCLIP_DRIVE) / norm)
+	return frames
+
+
+# Adds amount * slope to every numeric leaf of value that the slope names.
+static func _shift(value, slope, amount: float):
+	if typeof(slope) == TYPE_DICTIONARY:
+		for key in slope.keys():
+			value[key] = _shift(value[key], slope[key], amount)
+		return value
+	if typeof(slope) == TYPE_ARRAY:
+		for i in range(min(slope.size(), value.size())):
+			value[i] = _shift(value[i], slope[i], amount)
+		return value
+	return float(value) + float(slope) * amount
@@ -3,8 +3,8 @@ extends Node
 const GameScript = preload("res://scripts/game/game.gd")
 const DataScript = preload("res://scripts/game/data.gd")
 const MetaProgressionScript = preload("res://scripts/game/meta_progression.gd")
+const SfxLibraryScript = preload("res://scripts/game/sfx_library.gd")
 const MENU_BACKDROP_PATH = "res://assets/ui/menu_backdrop.svg"
-const UI_CLICK_SFX_PATH = "res://assets/audio/sfx_click.wav"
 
 var menu_layer: CanvasLayer
 var menu_root: Control
@@ -91,8 +91,9 @@ func _build_menu() -> void:
 	ui_sfx_player = AudioStreamPlayer.new()
 	add_child(ui_sfx_player)
 	ui_sfx_player.bus = "Master"
-	if ResourceLoader.exists(UI_CLICK_SFX_PATH):
-		ui_sfx_player.stream = load(UI_CLICK_SFX_PATH)
+	var ui_click_streams: Array = SfxLibraryScript.load_group("ui_click")
+	if not ui_click_streams.is_empty():
+		ui_sfx_player.stream = ui_click_streams[0]
 
 	menu_root = Control.new()
 	menu_root.set_anchors_preset(Control.PRESET_FULL_RECT)